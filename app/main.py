@@ -1,22 +1,49 @@
+import asyncio
 import base64
 import io
 import logging
+import multiprocessing
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
 from typing import Optional
 
+import cv2
 import numpy as np
+import onnxruntime as ort
+import pybase64
+import xxhash
+from cachetools import LRUCache
+from paddle import inference as paddle_inference
 from fastapi import FastAPI, HTTPException, Security
 from fastapi.security.api_key import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
-from PIL import Image
+from fastapi.responses import ORJSONResponse
+from PIL import Image, UnidentifiedImageError
 from pydantic import BaseModel
 from paddleocr import PaddleOCR
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+# `tools` is made importable by the paddleocr import above
+from tools.infer.predict_system import sorted_boxes
+from tools.infer.utility import get_minarea_rect_crop, get_rotate_crop_image
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="PaddleOCR Service", version="1.0.0")
+# orjson — responses carry one box (4×2 coords) per detected line, stdlib json is slow on that
+app = FastAPI(
+    title="PaddleOCR Service",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # Internal service only — no public CORS needed
 app.add_middleware(
@@ -52,30 +79,446 @@ _DET_MODEL_DIR = f"{_PADDLE_HOME}/det/multilingual/Multilingual_PP-OCRv3_det_inf
 _REC_MODEL_DIR = f"{_PADDLE_HOME}/rec/latin/latin_PP-OCRv3_rec_infer"
 _CLS_MODEL_DIR = f"{_PADDLE_HOME}/cls/ch_ppocr_mobile_v2.0_cls_infer"
 
-# Initialize PaddleOCR once at startup (models already baked in image)
+# ONNX exports of the same models (paddle2onnx, at image build time). ONNXRuntime's
+# CPU kernels are much faster than Paddle Inference here; OCR_USE_ONNX=0 falls back.
+USE_ONNX = os.environ.get("OCR_USE_ONNX", "1") == "1"
+# INT8-quantized rec model (ONNX only; OCR_REC_INT8=0 to disable). The build only keeps
+# model.int8.onnx if it passed the accuracy check against FP32, so fall back when it's absent.
+_REC_INT8_PATH = f"{_REC_MODEL_DIR}/model.int8.onnx"
+REC_INT8 = os.environ.get("OCR_REC_INT8", "1") == "1" and os.path.exists(_REC_INT8_PATH)
+if USE_ONNX:
+    _MODEL_PATHS = {
+        "det": f"{_DET_MODEL_DIR}/model.onnx",
+        "rec": _REC_INT8_PATH if REC_INT8 else f"{_REC_MODEL_DIR}/model.onnx",
+        "cls": f"{_CLS_MODEL_DIR}/model.onnx",
+    }
+else:
+    _MODEL_PATHS = {"det": _DET_MODEL_DIR, "rec": _REC_MODEL_DIR, "cls": _CLS_MODEL_DIR}
+
+# PaddleOCR engine — one per OCR worker process, built by the pool initializer
+# (models already baked in image)
 ocr_engine = None
 
+# MKLDNN is ~2x faster on CPU but unstable as shipped — opt in with OCR_ENABLE_MKLDNN=1.
+# When on, the two fc passes behind the known crash/accuracy regressions are removed.
+ENABLE_MKLDNN = os.environ.get("OCR_ENABLE_MKLDNN", "0") == "1"
+_MKLDNN_BROKEN_PASSES = ("fc_mkldnn_pass", "fc_act_mkldnn_fuse_pass")
+# Inference thread budget for the whole container, split across every OCR engine process
+# of every uvicorn worker. Assumes 2-way SMT; override with OCR_CPU_THREADS on hosts without it
+CPU_THREADS = int(os.environ.get("OCR_CPU_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Bound concurrent inference — PaddleOCR crashes ("could not execute a primitive")
+# when calls share an engine, and it holds the GIL in pre/postprocessing. Each slot
+# is a worker process with its own engine, so inference scales across cores.
+OCR_MAX_CONCURRENCY = int(os.environ.get("OCR_MAX_CONCURRENCY", "2"))
+# uvicorn worker count — each one starts its own OCR_MAX_CONCURRENCY engine processes
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+_WORKER_CPU_THREADS = max(1, CPU_THREADS // (OCR_MAX_CONCURRENCY * WEB_CONCURRENCY))
+_ocr_sem = asyncio.Semaphore(OCR_MAX_CONCURRENCY)
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+
+# Micro-batching — requests arriving together share one recognition pass
+OCR_BATCH_SIZE = int(os.environ.get("OCR_BATCH_SIZE", "8"))
+OCR_BATCH_WAIT_MS = int(os.environ.get("OCR_BATCH_WAIT_MS", "50"))
+
+
+class AsyncBatchQueue:
+    """Groups queued items into batches of up to `max_batch_size`, waiting at
+    most `max_wait_time` seconds after the first item, and hands each batch to
+    `process_fn` (an async callable returning one result per item)."""
+
+    def __init__(self, process_fn, max_batch_size: int = 8, max_wait_time: float = 0.05):
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def add_request(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_time
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Don't wait for this batch — the next one can form meanwhile
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await self.process_fn(items)
+        except Exception as e:
+            if len(batch) == 1:
+                _, future = batch[0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # Re-run items one by one so the error only reaches the request behind it
+            logger.warning(f"Batch of {len(batch)} failed ({e}) — retrying items individually")
+            if isinstance(e, BrokenProcessPool):
+                # One at a time: run concurrently, the image that crashed the worker would take
+                # the fresh pool down again together with every innocent neighbour still on it
+                for entry in batch:
+                    await self._dispatch([entry])
+            else:
+                await asyncio.gather(*(self._dispatch([entry]) for entry in batch))
+            return
+        for (_, future), res in zip(batch, results):
+            if not future.done():
+                future.set_result(res)
+
+
+def _is_transient_ocr_error(e: BaseException) -> bool:
+    # oneDNN primitive contention under concurrent load — succeeds when retried
+    return isinstance(e, RuntimeError) and "could not execute a primitive" in str(e)
+
+
+# Runs in the OCR worker, so backoff sleeps keep holding the concurrency slot
+# rather than letting retries pile extra load onto the engine.
+@retry(
+    retry=retry_if_exception(_is_transient_ocr_error),
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=0.05, max=0.5),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
+)
+def _run_ocr_batch(images: list) -> list:
+    """Same output as `ocr_engine.ocr(img, cls=True)` for each image (except that
+    boxes stay 4×2 float32 arrays), but with the crops of every image classified
+    and recognized in one batch.
+
+    PaddleOCR rejects list input when detection is on, so this replays
+    TextSystem.__call__ with recognition hoisted out of the per-image loop.
+    """
+    args = ocr_engine.args
+    crop = get_rotate_crop_image if args.det_box_type == "quad" else get_minarea_rect_crop
+
+    per_image_boxes = []
+    crops = []
+    for img in images:
+        dt_boxes, _ = ocr_engine.text_detector(img)
+        boxes = sorted_boxes(dt_boxes) if dt_boxes is not None and len(dt_boxes) else []
+        per_image_boxes.append(boxes)
+        crops.extend(crop(img, box.copy()) for box in boxes)
+
+    rec_res = []
+    if crops:
+        if ocr_engine.use_angle_cls:
+            crops, _, _ = ocr_engine.text_classifier(crops)
+        rec_res, _ = ocr_engine.text_recognizer(crops)
+
+    results = []
+    offset = 0
+    for boxes in per_image_boxes:
+        image_rec = rec_res[offset:offset + len(boxes)]
+        offset += len(boxes)
+        lines = [
+            [box, rec]
+            for box, rec in zip(boxes, image_rec)
+            if rec[1] >= ocr_engine.drop_score
+        ]
+        results.append([lines or None])
+    return results
+
+
+def _ocr_shared_batch(specs: list) -> list:
+    """Worker entry point: `_run_ocr_batch` over images the main process placed
+    in shared memory, given as (name, shape, dtype) tuples."""
+    segments = [SharedMemory(name=name) for name, _, _ in specs]
+    images = None
+    try:
+        images = [
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            for shm, (_, shape, dtype) in zip(segments, specs)
+        ]
+        return _run_ocr_batch(images)
+    finally:
+        images = None
+        for shm in segments:
+            try:
+                shm.close()
+            except BufferError:
+                # A traceback in flight still holds views — the mapping is freed with it
+                pass
+
+
+def _shm_capacity() -> int:
+    try:
+        st = os.statvfs("/dev/shm")
+    except OSError:
+        return 0
+    return st.f_bavail * st.f_frsize
+
+
+# Bytes of decoded images allowed in /dev/shm at once. Writing into a full tmpfs is a
+# SIGBUS that kills the whole process, so stay well inside what's free (shared with
+# the other uvicorn workers); batches that don't fit are pickled to the worker instead.
+SHM_BUDGET = min(
+    int(os.environ.get("OCR_SHM_BUDGET_MB", "256")) << 20,
+    _shm_capacity() // (2 * WEB_CONCURRENCY),
+)
+_shm_in_use = 0  # only touched from the event loop
+
+
+def _to_shared(images: list) -> tuple[list, list]:
+    """Copy images into new SharedMemory segments; returns (segments, specs)."""
+    segments, specs = [], []
+    try:
+        for img in images:
+            shm = SharedMemory(create=True, size=img.nbytes)
+            segments.append(shm)
+            np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+            specs.append((shm.name, img.shape, img.dtype.str))
+    except BaseException:
+        _release_shared(segments)
+        raise
+    return segments, specs
+
+
+def _release_shared(segments: list) -> None:
+    for shm in segments:
+        shm.close()
+        shm.unlink()
+
+
+def _init_ocr_worker() -> None:
+    global ocr_engine
+    ocr_engine = _create_engine()
+
+
+def _ocr_worker_pid() -> int:
+    # Only runs once this worker's initializer (engine load) has finished. The short
+    # hold stops one ready worker from draining every probe while others still load.
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def _start_ocr_pool() -> ProcessPoolExecutor:
+    # spawn, not fork — the parent already runs an event loop and threads
+    return ProcessPoolExecutor(
+        max_workers=OCR_MAX_CONCURRENCY,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_ocr_worker,
+    )
+
+
+async def _ocr_batch(images: list) -> list:
+    global _ocr_pool, _shm_in_use
+    async with _ocr_sem:
+        # Read only once we hold a slot — the pool may have been replaced while we waited
+        pool = _ocr_pool
+        loop = asyncio.get_running_loop()
+        nbytes = sum(img.nbytes for img in images)
+        segments = []
+        reserved = 0
+        try:
+            if _shm_in_use + nbytes <= SHM_BUDGET:
+                # Hand images over by shared-memory name instead of pickling the pixels;
+                # the copy runs on the decode pool so the event loop never does it
+                _shm_in_use += nbytes
+                reserved = nbytes
+                segments, specs = await loop.run_in_executor(_decode_pool, _to_shared, images)
+                return await loop.run_in_executor(pool, _ocr_shared_batch, specs)
+            # Over the shm budget — pickling is slower but can't exhaust /dev/shm
+            return await loop.run_in_executor(pool, _run_ocr_batch, images)
+        except BrokenProcessPool:
+            # A worker died (native crash) — replace the pool so later requests recover
+            if _ocr_pool is pool:
+                logger.error("OCR worker process died — restarting the pool")
+                pool.shutdown(wait=False)
+                _ocr_pool = _start_ocr_pool()
+            raise
+        finally:
+            _release_shared(segments)
+            _shm_in_use -= reserved
+
+
+_ocr_queue = AsyncBatchQueue(
+    _ocr_batch, max_batch_size=OCR_BATCH_SIZE, max_wait_time=OCR_BATCH_WAIT_MS / 1000
+)
+
+
+_paddle_create_predictor = paddle_inference.create_predictor
+
+
+def _create_predictor_without_broken_passes(config):
+    for name in _MKLDNN_BROKEN_PASSES:
+        config.delete_pass(name)
+    return _paddle_create_predictor(config)
+
+
+_ort_inference_session = ort.InferenceSession
+
+
+def _create_ort_session(path, *args, **kwargs):
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    so.intra_op_num_threads = _WORKER_CPU_THREADS
+    return _ort_inference_session(path, sess_options=so, providers=["CPUExecutionProvider"])
+
+
+def _create_engine() -> PaddleOCR:
+    # PaddleOCR builds each predictor/session internally with fixed options, so
+    # ours have to be applied on the way into the constructor.
+    if USE_ONNX:
+        ort.InferenceSession = _create_ort_session
+    elif ENABLE_MKLDNN:
+        paddle_inference.create_predictor = _create_predictor_without_broken_passes
+    try:
+        return PaddleOCR(
+            use_angle_cls=True,
+            lang="latin",  # 'latin' = correct model for French; PaddleOCR has no 'french' model
+            use_gpu=False,
+            show_log=False,
+            enable_mkldnn=ENABLE_MKLDNN,  # off by default — more stable on CPU-only servers
+            cpu_threads=_WORKER_CPU_THREADS,
+            use_onnx=USE_ONNX,
+            det_model_dir=_MODEL_PATHS["det"],
+            rec_model_dir=_MODEL_PATHS["rec"],
+            cls_model_dir=_MODEL_PATHS["cls"],
+        )
+    finally:
+        paddle_inference.create_predictor = _paddle_create_predictor
+        ort.InferenceSession = _ort_inference_session
+
 
 @app.on_event("startup")
 async def startup():
-    global ocr_engine
-    logger.info("Initializing PaddleOCR with pre-downloaded models...")
-    logger.info(f"  det: {_DET_MODEL_DIR}")
-    logger.info(f"  rec: {_REC_MODEL_DIR}")
-    logger.info(f"  cls: {_CLS_MODEL_DIR}")
-    ocr_engine = PaddleOCR(
-        use_angle_cls=True,
-        lang="latin",  # 'latin' = correct model for French; PaddleOCR has no 'french' model
-        use_gpu=False,
-        show_log=False,
-        enable_mkldnn=False,  # more stable on CPU-only servers
-        det_model_dir=_DET_MODEL_DIR,
-        rec_model_dir=_REC_MODEL_DIR,
-        cls_model_dir=_CLS_MODEL_DIR,
+    global _ocr_pool
+    logger.info("Initializing PaddleOCR workers with pre-downloaded models...")
+    logger.info(f"  det: {_MODEL_PATHS['det']}")
+    logger.info(f"  rec: {_MODEL_PATHS['rec']}")
+    logger.info(f"  cls: {_MODEL_PATHS['cls']}")
+    logger.info(
+        f"  onnx: {USE_ONNX}, mkldnn: {ENABLE_MKLDNN}, "
+        f"workers: {OCR_MAX_CONCURRENCY} x {_WORKER_CPU_THREADS} threads"
     )
+    pool = _start_ocr_pool()
+    # Each worker loads its engine in the pool initializer — keep probing until every
+    # worker process has answered at least once
+    loop = asyncio.get_running_loop()
+    ready_pids: set = set()
+    while len(ready_pids) < OCR_MAX_CONCURRENCY:
+        ready_pids.update(await asyncio.gather(
+            *(loop.run_in_executor(pool, _ocr_worker_pid) for _ in range(OCR_MAX_CONCURRENCY))
+        ))
+    _ocr_pool = pool
+    _ocr_queue.start()
     logger.info("✅ PaddleOCR ready (no runtime downloads)")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown(cancel_futures=True)
+
+
+# Below this size pybase64's SIMD dispatch costs more than it saves
+_SIMD_B64_MIN_LEN = 1024
+
+
+def _b64decode(raw: str) -> bytes:
+    if len(raw) < _SIMD_B64_MIN_LEN:
+        return base64.b64decode(raw)
+    return pybase64.b64decode(raw, validate=False)
+
+
+# Early rejection of pathological inputs, before any decode work is spent on them.
+# ~15 MB of base64 ≈ an 11 MB image file.
+MAX_B64_LEN = int(os.environ.get("OCR_MAX_B64", str(15_000_000)))
+# Decompression-bomb guard — checked against the header before either decoder runs
+MAX_IMAGE_PIXELS = int(os.environ.get("OCR_MAX_IMAGE_PIXELS", str(25_000_000)))
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# OpenCV decodes straight to a contiguous BGR array — PaddleOCR's native channel
+# order — using its bundled libjpeg-turbo for JPEG
+_IMDECODE_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+
+
+def _decode_image(image_bytes: bytes) -> np.ndarray:
+    # PIL opens lazily — this only parses the header, so oversized images are
+    # rejected before any pixel memory is allocated
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+    except UnidentifiedImageError:
+        image = None  # leave it to OpenCV (capped by OPENCV_IO_MAX_IMAGE_PIXELS)
+    else:
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            # PIL itself only warns up to 2x its limit
+            raise Image.DecompressionBombError(
+                f"Image size ({image.width}x{image.height}) exceeds limit of {MAX_IMAGE_PIXELS} pixels"
+            )
+    img_array = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), _IMDECODE_FLAGS)
+    if img_array is not None:
+        return img_array
+    if image is None:
+        raise ValueError("Unsupported or corrupt image data")
+    # Formats OpenCV can't read (e.g. GIF) — fall back to PIL
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    rgb = np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(image.height, image.width, 3)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+# Detection cost scales with H·W — cap the longer side (0 disables the cap)
+MAX_SIDE_LEN = int(os.environ.get("OCR_MAX_SIDE_LEN", "1600"))
+
+
+def _limit_side(img_array: np.ndarray) -> tuple[np.ndarray, float]:
+    """Return the (possibly downscaled) image and the scale factor applied."""
+    h, w = img_array.shape[:2]
+    if MAX_SIDE_LEN <= 0 or max(h, w) <= MAX_SIDE_LEN:
+        return img_array, 1.0
+    scale = MAX_SIDE_LEN / max(h, w)
+    resized = cv2.resize(img_array, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+# Separate from the OCR pool so decoding never waits behind inference
+DECODE_WORKERS = int(os.environ.get("OCR_DECODE_WORKERS", "2"))
+_decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="decode")
+
+
+def _decode_payload(raw: str) -> tuple[bytes, str]:
+    """base64 (optionally a data URI) → image bytes and their content hash."""
+    # Data-URI header ("data:image/jpeg;base64,") is always short — only look there
+    comma = raw.find(",", 0, 64)
+    if comma != -1:
+        raw = raw[comma + 1:]
+    image_bytes = _b64decode(raw)
+    return image_bytes, xxhash.xxh3_64_hexdigest(image_bytes)
+
+
+def _decode(image_bytes: bytes) -> tuple[np.ndarray, float]:
+    """Image bytes → BGR array ready for OCR, plus the scale applied to it."""
+    return _limit_side(_decode_image(image_bytes))
+
+
+# Content-addressed cache of successful responses — retries and re-submits of the
+# same image skip OCR entirely. Only touched from the event loop, so no lock needed.
+CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", "512"))
+_result_cache: Optional[LRUCache] = LRUCache(maxsize=CACHE_SIZE) if CACHE_SIZE > 0 else None
+
+
 class OcrRequest(BaseModel):
     image_base64: str
     mime_type: Optional[str] = "image/jpeg"
@@ -93,69 +536,71 @@ class OcrResponse(BaseModel):
 
 @app.get("/health")
 def health():
-    models_present = all(
-        os.path.isdir(p) for p in [_DET_MODEL_DIR, _REC_MODEL_DIR, _CLS_MODEL_DIR]
-    )
+    models_present = all(os.path.exists(p) for p in _MODEL_PATHS.values())
     return {
         "status": "ok",
         "engine": "paddleocr",
-        "ready": ocr_engine is not None,
+        "backend": "onnxruntime" if USE_ONNX else "paddle",
+        "ready": _ocr_pool is not None,
         "models_baked": models_present,
-        "model_paths": {
-            "det": _DET_MODEL_DIR,
-            "rec": _REC_MODEL_DIR,
-            "cls": _CLS_MODEL_DIR,
-        },
+        "model_paths": _MODEL_PATHS,
     }
 
 
 @app.post("/process-base64", response_model=OcrResponse)
 async def process_base64(req: OcrRequest, _key: str = Security(verify_api_key)):
-    if ocr_engine is None:
+    if _ocr_pool is None:
         raise HTTPException(status_code=503, detail="OCR engine not ready")
+    if len(req.image_base64) > MAX_B64_LEN:
+        raise HTTPException(status_code=413, detail="Payload too large")
 
     start = time.time()
 
     try:
-        # Decode base64 image
-        raw = req.image_base64
-        if "," in raw:
-            raw = raw.split(",", 1)[1]
-        image_bytes = base64.b64decode(raw)
+        # Decode base64 image off the event loop
+        loop = asyncio.get_running_loop()
+        image_bytes, cache_key = await loop.run_in_executor(
+            _decode_pool, _decode_payload, req.image_base64
+        )
+        cached = _result_cache.get(cache_key) if _result_cache is not None else None
+        if cached is not None:
+            elapsed_ms = int((time.time() - start) * 1000)
+            logger.info(f"OCR cache hit: {cache_key}, {elapsed_ms}ms")
+            return OcrResponse(**cached, processing_time_ms=elapsed_ms)
 
-        # Convert to numpy array via PIL
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        img_array = np.array(image)
+        img_array, scale = await loop.run_in_executor(
+            _decode_pool, _decode, image_bytes
+        )
 
         # Run OCR
-        result = ocr_engine.ocr(img_array, cls=True)
-
-        lines = []
-        full_text_parts = []
-        total_conf = 0.0
-        count = 0
-
-        if result and result[0]:
-            for line in result[0]:
-                box, (text, conf) = line
-                lines.append({"text": text, "confidence": round(conf, 4), "box": box})
-                full_text_parts.append(text)
-                total_conf += conf
-                count += 1
-
-        avg_conf = round(total_conf / count, 4) if count > 0 else 0.0
-        full_text = "\n".join(full_text_parts)
+        result = await _ocr_queue.add_request(img_array)
+
+        items = (result and result[0]) or []
+        texts = [line[1][0] for line in items]
+        confs = [line[1][1] for line in items]
+        boxes = []
+        if items:
+            box_array = np.asarray([line[0] for line in items], dtype=np.float32)
+            if scale != 1.0:
+                # Report boxes in the caller's original pixel coordinates
+                box_array /= scale
+            # Whole-pixel coords: one vectorized conversion into plain ints for the encoder
+            boxes = np.rint(box_array).astype(np.int32).tolist()
+        lines = [
+            {"text": text, "confidence": round(conf, 4), "box": box}
+            for text, conf, box in zip(texts, confs, boxes)
+        ]
+        count = len(confs)
+        avg_conf = round(sum(confs) / count, 4) if count else 0.0
+        full_text = "\n".join(texts)
         elapsed_ms = int((time.time() - start) * 1000)
 
         logger.info(f"OCR done: {count} lines, conf={avg_conf}, {elapsed_ms}ms")
 
-        return OcrResponse(
-            success=True,
-            text=full_text,
-            lines=lines,
-            confidence=avg_conf,
-            processing_time_ms=elapsed_ms,
-        )
+        response = {"success": True, "text": full_text, "lines": lines, "confidence": avg_conf}
+        if _result_cache is not None:
+            _result_cache[cache_key] = response
+        return OcrResponse(**response, processing_time_ms=elapsed_ms)
 
     except Exception as e:
         logger.error(f"OCR error: {e}")
@@ -0,0 +1,164 @@
+"""Build-time INT8 quantization of the recognition model, gated on accuracy.
+
+Quantizes <rec_dir>/model.onnx (dynamic, uint8 weights — the only ConvInteger
+kernel ORT's CPU provider has, so the conv backbone is quantized too), then
+recognizes a set of rendered French text lines with both models. model.int8.onnx
+is kept only if its character accuracy is within MAX_ACCURACY_DROP of FP32;
+otherwise it is removed and the service keeps serving the FP32 model.
+
+Usage: python quantize_rec.py <rec_dir>
+"""
+import importlib.util
+import math
+import os
+import sys
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from PIL import Image, ImageDraw, ImageFont
+
+MAX_ACCURACY_DROP = 0.01
+# Below this the harness itself is off (preprocessing, dict) and the comparison means nothing
+MIN_FP32_ACCURACY = 0.8
+_FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+_FONT_SIZES = (24, 32, 40)
+# Same input geometry as PaddleOCR's PP-OCRv3 rec preprocessing (rec_image_shape 3,48,320)
+_IMG_H, _MIN_IMG_W = 48, 320
+
+_SAMPLES = [
+    "Facture n° 2024-0137",
+    "Date d'échéance : 15/03/2024",
+    "Montant total TTC : 1 245,80 €",
+    "TVA 20 % incluse",
+    "Société Générale — Agence Lyon",
+    "IBAN FR76 3000 6000 0112 3456 7890 189",
+    "Référence client : ABX-77412",
+    "Adresse : 12, rue de la Paix",
+    "75002 Paris, France",
+    "Numéro SIRET 552 120 222 00013",
+    "Bon de livraison",
+    "Quantité commandée : 48",
+    "Prix unitaire hors taxes",
+    "Conditions générales de vente",
+    "Pénalités de retard applicables",
+    "Reçu le 3 février 2024",
+    "Mme Hélène Dupré",
+    "M. François Lefèvre",
+    "Carte d'identité nationale",
+    "Né le 27 août 1985 à Marseille",
+    "Permis de conduire",
+    "Relevé de compte bancaire",
+    "Solde créditeur au 31/12",
+    "Œuvre à caractère économique",
+    "Ça coûte très cher, non ?",
+    "L'élève a reçu son diplôme",
+    "Contrat à durée indéterminée",
+    "Période d'essai : deux mois",
+    "Salaire brut mensuel : 2 850,00",
+    "Cotisations sociales salariales",
+    "Déclaration de revenus 2023",
+    "Avis d'imposition",
+    "Quittance de loyer",
+    "Attestation d'assurance habitation",
+    "Échéancier de paiement",
+    "Remboursement anticipé",
+    "Signature du représentant légal",
+    "Fait à Bordeaux, le 9 mai",
+    "Page 1 sur 3",
+    "Merci de votre confiance !",
+]
+
+
+def _render(text: str, size: int) -> np.ndarray:
+    font = ImageFont.truetype(_FONT_PATH, size)
+    left, top, right, bottom = font.getbbox(text)
+    pad = size // 4
+    image = Image.new("RGB", (right - left + 2 * pad, bottom - top + 2 * pad), "white")
+    ImageDraw.Draw(image).text((pad - left, pad - top), text, font=font, fill="black")
+    return np.asarray(image)
+
+
+def _preprocess(img: np.ndarray) -> np.ndarray:
+    h, w = img.shape[:2]
+    resized_w = math.ceil(_IMG_H * w / h)
+    img_w = max(_MIN_IMG_W, resized_w)
+    resized = Image.fromarray(img).resize((resized_w, _IMG_H), Image.BILINEAR)
+    x = (np.asarray(resized, dtype=np.float32) / 255 - 0.5) / 0.5
+    out = np.zeros((1, 3, _IMG_H, img_w), dtype=np.float32)
+    out[0, :, :, :resized_w] = x.transpose(2, 0, 1)
+    return out
+
+
+def _ctc_decode(probs: np.ndarray, chars: list) -> str:
+    # Greedy CTC: collapse repeats, drop the blank (index 0)
+    best = probs.argmax(axis=-1)
+    keep = np.insert(best[1:] != best[:-1], 0, True) & (best != 0)
+    return "".join(chars[i] for i in best[keep])
+
+
+def _edit_distance(a: str, b: str) -> int:
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+
+def _char_accuracy(session: ort.InferenceSession, dataset: list, chars: list) -> float:
+    input_name = session.get_inputs()[0].name
+    errors = total = 0
+    for text, x in dataset:
+        pred = _ctc_decode(session.run(None, {input_name: x})[0][0], chars)
+        errors += _edit_distance(pred, text)
+        total += len(text)
+    return max(0.0, 1 - errors / total)
+
+
+def _load_chars() -> list:
+    # Read the dict from the installed package without importing it (imports paddle)
+    pkg_dir = os.path.dirname(importlib.util.find_spec("paddleocr").origin)
+    with open(os.path.join(pkg_dir, "ppocr/utils/dict/latin_dict.txt"), encoding="utf-8") as f:
+        chars = [line.rstrip("\r\n") for line in f]
+    return ["blank"] + chars + [" "]  # use_space_char=True
+
+
+def _reject(int8_path: str, reason: str) -> None:
+    os.remove(int8_path)
+    print(f"{reason} — keeping FP32 rec model")
+
+
+def main(rec_dir: str) -> None:
+    fp32_path = os.path.join(rec_dir, "model.onnx")
+    int8_path = os.path.join(rec_dir, "model.int8.onnx")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+
+    providers = ["CPUExecutionProvider"]
+    fp32 = ort.InferenceSession(fp32_path, providers=providers)
+    # Smoke load — a broken export fails here, not at service startup
+    int8 = ort.InferenceSession(int8_path, providers=providers)
+
+    ops = [node.op_type for node in onnx.load(int8_path).graph.node]
+    print(f"int8 rec: {ops.count('ConvInteger')} ConvInteger, {ops.count('Conv')} Conv left FP32")
+
+    chars = _load_chars()
+    num_classes = fp32.get_outputs()[0].shape[-1]
+    if isinstance(num_classes, int) and num_classes != len(chars):
+        _reject(int8_path, f"model has {num_classes} classes but the dict gives {len(chars)}")
+        return
+
+    dataset = [(t, _preprocess(_render(t, size))) for t in _SAMPLES for size in _FONT_SIZES]
+    fp32_acc = _char_accuracy(fp32, dataset, chars)
+    int8_acc = _char_accuracy(int8, dataset, chars)
+    print(f"rec char accuracy on {len(dataset)} lines: fp32={fp32_acc:.4f} int8={int8_acc:.4f}")
+
+    if fp32_acc < MIN_FP32_ACCURACY:
+        _reject(int8_path, f"FP32 accuracy {fp32_acc:.4f} is too low to trust the comparison")
+    elif fp32_acc - int8_acc > MAX_ACCURACY_DROP:
+        _reject(int8_path, f"INT8 loses more than {MAX_ACCURACY_DROP:.0%} accuracy")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])